@@ -0,0 +1,104 @@
+"""
+Checks that the configured encoder (matcher.MODEL_NAME, with the configured
+backend and precision) ranks JD/resume pairs like the reference model.
+
+Run: python check_model.py
+Exits with a non-zero status if the Spearman correlation is below the threshold.
+"""
+import sys
+from itertools import product
+
+from scipy.stats import spearmanr
+from sentence_transformers import SentenceTransformer
+
+import matcher
+
+REFERENCE_MODEL = 'all-MiniLM-L6-v2'
+MIN_SPEARMAN = 0.95
+
+# Held-out job descriptions; every JD is scored against every resume.
+JOB_DESCRIPTIONS = [
+    "Senior Java Developer wanted. Must know Java, Spring, AWS, and SQL. Python is a plus.",
+    "Frontend engineer with strong React, TypeScript and Next.js experience to build our web app.",
+    "Data scientist skilled in Python, pandas, scikit-learn and deep learning with PyTorch.",
+    "DevOps engineer to manage Kubernetes clusters, Docker images, Terraform and CI pipelines on GCP.",
+    "Product manager to own the roadmap, run agile ceremonies and work closely with UI/UX design.",
+    "Business analyst with Power BI and Tableau experience for data visualization and reporting.",
+]
+
+# Held-out resumes of realistic length and layout. Each is written independently: some
+# open with a summary of the role, others list education or interests first, and the
+# role-specific details are spread over the whole text. Lengths range from one line
+# to a full paragraph.
+RESUMES = [
+    "Backend developer with 6 years of experience. Designed Java and Spring Boot microservices "
+    "deployed on AWS, modelled PostgreSQL schemas and tuned slow SQL queries. Introduced contract "
+    "testing between services and cut the average API response time by a third. On-call lead for "
+    "the payments platform. Wrote Python scripts for data migrations and nightly reconciliation jobs. "
+    "Education: BSc Computer Science. Interests: cycling and open-source contributions.",
+    "Education: BA in Media Design, minor in Computer Science. Started as a web designer at a small "
+    "agency, building marketing sites for local businesses. Moved into engineering and spent four "
+    "years as a frontend engineer: built responsive web apps in React and TypeScript, set up a shared "
+    "component library, migrated a large codebase to Next.js and improved Core Web Vitals across "
+    "the product. Mentors junior developers and runs the team's accessibility reviews.",
+    "Machine learning engineer. Trained NLP and deep learning models in PyTorch, did feature "
+    "engineering with pandas and scikit-learn, and deployed models behind Python APIs.",
+    "Summary: engineer who likes keeping systems boring and reliable. Previously a Linux system "
+    "administrator at a university, maintaining mail servers, backups and the campus network. "
+    "Currently a site reliability engineer: runs Kubernetes clusters on GCP, builds Docker images "
+    "and CI pipelines, manages infrastructure as code with Terraform and Ansible, and owns the "
+    "incident response process. Certifications: CKA, Google Professional Cloud Architect. "
+    "Languages: English, German. Hobbies: amateur radio and bouldering.",
+    "Product manager with a background in customer support. Led cross-functional teams, defined "
+    "quarterly roadmaps, ran scrum sprints and agile ceremonies, and worked with UI/UX design on "
+    "user research and prototypes. Launched a self-service onboarding flow that halved support tickets.",
+    "Volunteer treasurer for a local charity and former retail store supervisor. Completed a data "
+    "analytics bootcamp, then joined a finance team as a business analyst. Builds Tableau and Power "
+    "BI dashboards, writes SQL reports for finance stakeholders, automates monthly reporting in Excel, "
+    "and presents data visualization insights to leadership. Currently learning Python for analysis.",
+    "Graphic designer. Created brand identities, packaging, marketing material and app mockups in "
+    "Figma and Adobe XD for agency clients. Comfortable presenting concepts to clients and iterating "
+    "on feedback. Portfolio includes work for a coffee chain, a music festival and a fintech startup. "
+    "Education: BFA Graphic Design. Interests: printmaking and typography.",
+    "High school math teacher with 10 years of classroom experience. Plans curriculum for algebra "
+    "and calculus, tutors students preparing for exams, coaches the school chess club and organises "
+    "the regional math olympiad. Introduced spreadsheet-based lessons on statistics.",
+]
+
+def score_pairs(encode_texts, pairs):
+    """Cosine similarity for each (jd, resume) pair, given a function returning normalized embeddings."""
+    jd_embeddings = encode_texts([jd for jd, _ in pairs])
+    resume_embeddings = encode_texts([resume for _, resume in pairs])
+    return (jd_embeddings * resume_embeddings).sum(dim=-1).tolist()
+
+if __name__ == "__main__":
+    pairs = list(product(JOB_DESCRIPTIONS, RESUMES))
+
+    candidate = matcher.get_model()
+    if candidate is None:
+        print("Cannot run check: Model failed to load.")
+        sys.exit(1)
+
+    print(f"Reference model: {REFERENCE_MODEL}")
+    if matcher.is_torch_model(candidate):
+        print(f"Candidate model: {matcher.MODEL_NAME} (backend=torch, precision={matcher.MATCHER_PRECISION})")
+    else:
+        print(f"Candidate model: {matcher.MODEL_NAME} (backend={candidate.backend}, int8-quantized)")
+
+    # The reference runs in plain fp32, unaffected by the candidate's precision setting
+    reference = SentenceTransformer(REFERENCE_MODEL)
+    reference_scores = score_pairs(
+        lambda texts: reference.encode(texts, convert_to_tensor=True, normalize_embeddings=True), pairs
+    )
+    candidate_scores = score_pairs(lambda texts: matcher.encode(candidate, texts), pairs)
+
+    correlation = spearmanr(reference_scores, candidate_scores).correlation
+    print(f"Spearman correlation over {len(pairs)} pairs: {correlation:.4f} (required > {MIN_SPEARMAN})")
+    max_drift = max(abs(reference - candidate) for reference, candidate in zip(reference_scores, candidate_scores))
+    print(f"Max absolute score drift: {max_drift:.4f}")
+
+    if correlation > MIN_SPEARMAN:
+        print("PASS")
+    else:
+        print("FAIL")
+        sys.exit(1)
@@ -1,19 +1,41 @@
-import os
-import tempfile
+import asyncio
+import hashlib
+import io
+import numpy as np
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 # Import our custom logic
 import parser
 import matcher
 
+def _log_warmup_result(task: asyncio.Task) -> None:
+    """Reports a failed background warmup, which would otherwise go unnoticed."""
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        print(f"Error warming up model: {task.exception()}")
+    elif not task.result():
+        print("Model warmup skipped: ML model could not be loaded.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warms up the ML model in the background so the server answers health checks while it loads."""
+    warmup_task = asyncio.create_task(asyncio.to_thread(matcher.warmup))
+    warmup_task.add_done_callback(_log_warmup_result)
+    app.state.warmup_task = warmup_task
+    yield
+    warmup_task.cancel()
+
 # Initialize the FastAPI app
 app = FastAPI(
     title="Automated Resume Screener API",
     description="API for parsing resumes and ranking them against job descriptions.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- CORS Middleware ---
@@ -47,16 +69,99 @@ class RankResult(BaseModel):
     final_score: float
     explanation: str
 
+class RankingEntry(BaseModel):
+    filename: str
+    experience_years: float
+    semantic_similarity: float
+    skill_coverage: float
+    final_score: float
+
 class ErrorResponse(BaseModel):
     detail: str
 
 
+# --- Helpers ---
+def _build_rank_result(
+    filename: str,
+    resume_data: Dict[str, Any],
+    jd_skills: List[str],
+    semantic_score: float
+) -> RankResult:
+    """Computes skill coverage and the final score, and packs everything into a RankResult."""
+    # 5. Calculate Skill Coverage
+    skill_coverage_data = matcher.check_skill_coverage(
+        resume_data["skill_mask"], 
+        parser.skills_to_mask(jd_skills)
+    )
+    
+    # 6. Compute Final Score
+    score_data = matcher.calculate_final_score(
+        semantic_score,
+        skill_coverage_data["coverage_percentage"]
+    )
+    
+    # 7. Format the response
+    return RankResult(
+        filename=filename,
+        resume_skills=resume_data["skills"],
+        experience_years=resume_data["experience_years"],
+        jd_skills=jd_skills,
+        semantic_similarity=semantic_score,
+        skill_coverage=SkillCoverage(**skill_coverage_data),
+        final_score=score_data["final_score"],
+        explanation=score_data["explanation"]
+    )
+
+async def _score_resumes(
+    job_description: str,
+    resume_files: List[UploadFile]
+) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
+    """
+    Parses several resumes and the JD concurrently and scores each resume's semantic similarity.
+    Returns the JD skills, the parsed resumes and their similarity scores (in upload order).
+    """
+    try:
+        resumes_bytes = [await resume_file.read() for resume_file in resume_files]
+        resume_hashes = [hashlib.sha256(resume_bytes).hexdigest() for resume_bytes in resumes_bytes]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading uploaded file: {e}")
+
+    jd_skills, jd_embedding, *resumes_data = await asyncio.gather(
+        asyncio.to_thread(parser.parse_skills_from_jd, job_description),
+        asyncio.to_thread(matcher.get_jd_embedding, job_description),
+        *(
+            asyncio.to_thread(parser.parse_resume, io.BytesIO(resume_bytes), resume_file.filename, resume_hash)
+            for resume_bytes, resume_file, resume_hash in zip(resumes_bytes, resume_files, resume_hashes)
+        )
+    )
+    for resume_file, resume_data in zip(resume_files, resumes_data):
+        if "error" in resume_data:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error parsing resume {resume_file.filename}: {resume_data['error']}"
+            )
+
+    # Submitted together, so the batcher encodes them in one forward pass
+    semantic_scores = await asyncio.gather(*(
+        matcher.calculate_semantic_similarity_async(resume_data["raw_text"], jd_embedding, resume_hash)
+        for resume_data, resume_hash in zip(resumes_data, resume_hashes)
+    ))
+    return jd_skills, resumes_data, list(semantic_scores)
+
+
 # --- API Endpoints ---
 @app.get("/", summary="Health Check")
 def read_root():
     """Root endpoint to check if the API is running."""
     return {"status": "ok", "message": "Resume Screener API is running!"}
 
+@app.post("/warmup", summary="Load and Warm Up the ML Model", responses={500: {"model": ErrorResponse}})
+async def warmup_model():
+    """Loads the ML model (if needed) and runs one dummy encode, so the first real request is fast."""
+    if not await asyncio.to_thread(matcher.warmup):
+        raise HTTPException(status_code=500, detail="ML Model could not be loaded.")
+    return {"status": "ok", "message": "ML model is loaded and warmed up."}
+
 @app.post(
     "/rank", 
     response_model=RankResult,
@@ -70,7 +175,7 @@ async def rank_resume(
     """
     This is the main endpoint. It performs the full pipeline:
     1.  Receives a job description (text) and a resume (file).
-    2.  Saves the resume to a temporary file.
+    2.  Reads the resume into memory.
     3.  Parses the resume to extract text, skills, and experience.
     4.  Parses the JD to extract required skills.
     5.  Calculates semantic similarity between the two.
@@ -80,69 +185,127 @@ async def rank_resume(
     """
     
     # Check for ML model
-    if matcher.MODEL is None:
+    if await asyncio.to_thread(matcher.get_model) is None:
         raise HTTPException(status_code=500, detail="ML Model is not loaded. Cannot process request.")
 
-    # 1. Save the uploaded file to a temporary location
+    # 1. Read the uploaded file into memory
     try:
-        # Use a temporary file to save the upload
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(resume_file.filename)[1]) as temp_file:
-            temp_file.write(await resume_file.read())
-            temp_file_path = temp_file.name
-            
+        resume_bytes = await resume_file.read()
+        resume_hash = hashlib.sha256(resume_bytes).hexdigest()
+        resume_stream = io.BytesIO(resume_bytes)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving temporary file: {e}")
+        raise HTTPException(status_code=500, detail=f"Error reading uploaded file: {e}")
 
     try:
-        # 2. Parse the resume
-        resume_data = parser.parse_resume(temp_file_path)
+        # 2 & 3. Parse the resume (straight from memory) and the Job Description concurrently.
+        # The JD embedding is independent of both, so it is computed alongside them.
+        # Worker threads keep the blocking PDF/DOCX extraction off the event loop.
+        resume_data, jd_skills, jd_embedding = await asyncio.gather(
+            asyncio.to_thread(parser.parse_resume, resume_stream, resume_file.filename, resume_hash),
+            asyncio.to_thread(parser.parse_skills_from_jd, job_description),
+            asyncio.to_thread(matcher.get_jd_embedding, job_description)
+        )
         if "error" in resume_data:
             raise HTTPException(status_code=400, detail=f"Error parsing resume: {resume_data['error']}")
         
-        # 3. Parse the Job Description
-        jd_skills = parser.parse_skills_from_jd(job_description)
-        
-        # 4. Calculate Semantic Similarity
-        semantic_score = matcher.calculate_semantic_similarity(
-            matcher.MODEL, 
+        # 4. Calculate Semantic Similarity (the encoder call is shared with concurrent requests)
+        semantic_score = await matcher.calculate_semantic_similarity_async(
             resume_data["raw_text"], 
-            job_description
-        )
-        
-        # 5. Calculate Skill Coverage
-        skill_coverage_data = matcher.check_skill_coverage(
-            resume_data["skills"], 
-            jd_skills
+            jd_embedding,
+            resume_hash
         )
         
-        # 6. Compute Final Score
-        score_data = matcher.calculate_final_score(
-            semantic_score,
-            skill_coverage_data["coverage_percentage"]
-        )
-        
-        # 7. Format the response
-        response = RankResult(
-            filename=resume_file.filename,
-            resume_skills=resume_data["skills"],
-            experience_years=resume_data["experience_years"],
-            jd_skills=jd_skills,
-            semantic_similarity=semantic_score,
-            skill_coverage=SkillCoverage(**skill_coverage_data),
-            final_score=score_data["final_score"],
-            explanation=score_data["explanation"]
-        )
-        
-        return response
+        # 5-7. Score and format the response
+        return _build_rank_result(resume_file.filename, resume_data, jd_skills, semantic_score)
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Catch-all for any other unexpected errors
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+@app.post(
+    "/rank_batch",
+    response_model=List[RankResult],
+    summary="Parse, Score, and Rank Several Resumes",
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
+)
+async def rank_resumes_batch(
+    job_description: str = Form(..., description="The full text of the job description."),
+    resume_files: List[UploadFile] = File(..., description="The candidates' resume files (PDF or DOCX).")
+):
+    """
+    Runs the /rank pipeline for several resumes against one job description.
+    All resumes are parsed concurrently and encoded in a single batched forward pass.
+    Results are returned best candidate first.
+    """
+    
+    # Check for ML model
+    if await asyncio.to_thread(matcher.get_model) is None:
+        raise HTTPException(status_code=500, detail="ML Model is not loaded. Cannot process request.")
+
+    try:
+        jd_skills, resumes_data, semantic_scores = await _score_resumes(job_description, resume_files)
+
+        results = [
+            _build_rank_result(resume_file.filename, resume_data, jd_skills, semantic_score)
+            for resume_file, resume_data, semantic_score in zip(resume_files, resumes_data, semantic_scores)
+        ]
+        results.sort(key=lambda result: result.final_score, reverse=True)
+        return results
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Catch-all for any other unexpected errors
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+@app.post(
+    "/rank_many",
+    response_model=List[RankingEntry],
+    summary="Rank Many Resumes (Compact)",
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
+)
+async def rank_many_resumes(
+    job_description: str = Form(..., description="The full text of the job description."),
+    resume_files: List[UploadFile] = File(..., description="The candidates' resume files (PDF or DOCX).")
+):
+    """
+    Ranks a pool of resumes against one job description and returns only the scores.
+    Skill coverage for all candidates is computed at once over a packed
+    (resumes x skills) bit matrix instead of one resume at a time.
+    Results are returned best candidate first.
+    """
     
-    finally:
-        # 8. Clean up the temporary file
-        if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
+    # Check for ML model
+    if await asyncio.to_thread(matcher.get_model) is None:
+        raise HTTPException(status_code=500, detail="ML Model is not loaded. Cannot process request.")
+
+    try:
+        jd_skills, resumes_data, semantic_scores = await _score_resumes(job_description, resume_files)
+
+        resume_matrix = np.stack([parser.pack_skills(resume_data["skills"]) for resume_data in resumes_data])
+        coverages = matcher.batch_skill_coverage(resume_matrix, parser.pack_skills(jd_skills))
+
+        results = [
+            RankingEntry(
+                filename=resume_file.filename,
+                experience_years=resume_data["experience_years"],
+                semantic_similarity=semantic_score,
+                skill_coverage=coverage,
+                final_score=matcher.calculate_final_score(semantic_score, coverage)["final_score"]
+            )
+            for resume_file, resume_data, semantic_score, coverage
+            in zip(resume_files, resumes_data, semantic_scores, coverages.tolist())
+        ]
+        results.sort(key=lambda result: result.final_score, reverse=True)
+        return results
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Catch-all for any other unexpected errors
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
 # --- To run this app ---
 # 1. Make sure you have all libraries from requirements.txt installed
@@ -1,63 +1,356 @@
-from sentence_transformers import SentenceTransformer, util
-from typing import List, Dict, Any
+import asyncio
+import contextlib
+import functools
+import hashlib
+import os
+import threading
 
-# Load the model once when the module is imported.
-# This saves time as we don't reload it for every request.
-print("Loading ML model... (This may take a moment)")
+# CPU threading has to be configured before torch is imported,
+# otherwise the OpenMP GEMM backend keeps its own default.
+NUM_THREADS = int(os.getenv("MATCHER_NUM_THREADS", os.cpu_count() or 1))
+os.environ.setdefault("OMP_NUM_THREADS", str(NUM_THREADS))
+
+import numpy as np
+import torch
+
+torch.set_num_threads(NUM_THREADS)
 try:
-    MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-    print("ML model loaded successfully.")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    MODEL = None
+    # One request is one forward pass, so inter-op parallelism only adds contention
+    torch.set_num_interop_threads(1)
+except RuntimeError:
+    pass  # Can only be set once per process (e.g. on reload)
+torch.backends.mkldnn.enabled = True
+
+from cachetools import LRUCache
+from sentence_transformers import SentenceTransformer
+from typing import List, Dict, Any, Optional
+from parser import mask_to_skills, skills_to_mask
+
+# MATCHER_MODEL=sentence-transformers/paraphrase-MiniLM-L3-v2 roughly halves the encoder FLOPs,
+# but it truncates at 128 tokens (all-MiniLM-L6-v2: 256). Only switch after check_model.py passes.
+MODEL_NAME = os.getenv("MATCHER_MODEL", "all-MiniLM-L6-v2")
+
+# "torch" (default) keeps the plain PyTorch model, "onnx" serves the encoder through
+# ONNX Runtime with an int8-quantized graph. Quantization changes the scores, so only
+# make "onnx" the default after check_model.py passes for it.
+MATCHER_BACKEND = os.getenv("MATCHER_BACKEND", "torch")
+ONNX_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "onnx-int8", MODEL_NAME.replace("/", "--")
+)
+ONNX_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+
+# "fp32" (default), "fp16" (GPU only) or "bf16" (autocast; CPUs with AVX-512 BF16 or GPUs).
+# Only switch after checking that similarity scores stay within ~1e-3 of fp32.
+MATCHER_PRECISION = os.getenv("MATCHER_PRECISION", "fp32")
+
+# Set MATCHER_COMPILE=1 to run the PyTorch encoder through torch.compile (fused kernels).
+MATCHER_COMPILE = os.getenv("MATCHER_COMPILE", "0") == "1"
+
+def _load_onnx_model() -> SentenceTransformer:
+    """
+    Loads the int8-quantized ONNX encoder, exporting it on first run.
+    The export is cached in ONNX_DIR so later starts only load the file.
+    """
+    if not os.path.exists(os.path.join(ONNX_DIR, ONNX_FILE)):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        print("Exporting quantized ONNX model... (only done once)")
+        onnx_model = SentenceTransformer(MODEL_NAME, backend="onnx")
+        onnx_model.save_pretrained(ONNX_DIR)
+        export_dynamic_quantized_onnx_model(onnx_model, "avx512_vnni", ONNX_DIR)
+
+    return SentenceTransformer(ONNX_DIR, backend="onnx", model_kwargs={"file_name": ONNX_FILE})
+
+def _compile_model(model: SentenceTransformer) -> None:
+    """
+    Replaces the Hugging Face model inside the first sentence-transformers module
+    with its torch.compile'd version, keeping the eager one if compilation fails.
+    """
+    transformer = model[0]
+    eager_model = transformer.auto_model
+    try:
+        # "default" mode: "reduce-overhead" replays CUDA graphs with static buffers, which is
+        # unsafe here because the encoder is called from several threads at once
+        transformer.auto_model = torch.compile(eager_model, mode="default", dynamic=True)
+        # Compilation is lazy, so run one encode to surface failures here rather than on a request
+        model.encode("warmup")
+        print("Encoder compiled with torch.compile.")
+    except Exception as e:
+        print(f"torch.compile failed, using the eager model: {e}")
+        transformer.auto_model = eager_model
+
+def _load_model() -> SentenceTransformer:
+    """
+    Loads the encoder for the configured backend.
+    Falls back to the PyTorch model if the ONNX path is unavailable.
+    """
+    if MATCHER_BACKEND == "onnx":
+        try:
+            model = _load_onnx_model()
+            if MATCHER_PRECISION != "fp32" or MATCHER_COMPILE:
+                print(
+                    "Warning: MATCHER_PRECISION and MATCHER_COMPILE only apply to MATCHER_BACKEND=torch; "
+                    "ignoring them for the ONNX model."
+                )
+            return model
+        except Exception as e:
+            print(f"Could not load ONNX model, falling back to PyTorch: {e}")
+
+    model = SentenceTransformer(MODEL_NAME)
+    if MATCHER_PRECISION == "fp16":
+        if model.device.type == "cuda":
+            model.half()
+        else:
+            print("Warning: MATCHER_PRECISION=fp16 needs a GPU; running in fp32.")
+    if MATCHER_COMPILE:
+        _compile_model(model)
+    return model
+
+# The model is loaded once, on first use (or by warmup()), and shared afterwards.
+# Loading lazily keeps imports and server startup fast.
+MODEL: Optional[SentenceTransformer] = None
+_model_lock = threading.Lock()
+_load_error: Optional[Exception] = None
+
+def get_model() -> Optional[SentenceTransformer]:
+    """
+    Returns the shared model, loading it on the first call.
+    Returns None if the model can't be loaded. A failed load is not retried,
+    so later calls return immediately instead of repeating it.
+    """
+    global MODEL, _load_error
+    if MODEL is None and _load_error is None:
+        with _model_lock:
+            if MODEL is None and _load_error is None:
+                print("Loading ML model... (This may take a moment)")
+                try:
+                    MODEL = _load_model()
+                    print("ML model loaded successfully.")
+                except Exception as e:
+                    print(f"Error loading model: {e}")
+                    _load_error = e
+    return MODEL
+
+def warmup() -> bool:
+    """Loads the model and runs one dummy encode to prime the kernels."""
+    model = get_model()
+    if model is None:
+        return False
+    encode(model, "warmup")
+    return True
 
-def calculate_semantic_similarity(model: SentenceTransformer, text1: str, text2: str) -> float:
+def is_torch_model(model: SentenceTransformer) -> bool:
+    """True if the model runs on PyTorch (the only backend the precision/compile settings apply to)."""
+    return getattr(model, "backend", "torch") == "torch"
+
+def _precision_context(model: SentenceTransformer):
+    """Returns the autocast context for the configured precision (a no-op for fp32/fp16 and ONNX)."""
+    if MATCHER_PRECISION == "bf16" and is_torch_model(model):
+        return torch.autocast(device_type=model.device.type, dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+def encode(model: SentenceTransformer, texts, **kwargs) -> torch.Tensor:
+    """
+    Encodes text(s) into L2-normalized fp32 embeddings at the configured precision.
+    All encoder calls go through here so the precision setting applies everywhere.
+    """
+    with _precision_context(model):
+        embeddings = model.encode(texts, convert_to_tensor=True, normalize_embeddings=True, **kwargs)
+    return embeddings.float()
+
+@functools.lru_cache(maxsize=256)
+def _encode_jd(jd_hash: str, jd_text: str) -> torch.Tensor:
+    """
+    Encodes a job description once and keeps the embedding around.
+    The same JD is usually matched against many resumes, so repeat calls
+    with the same hash skip the encoder entirely.
+    """
+    return encode(get_model(), jd_text)
+
+def get_jd_embedding(jd_text: str) -> Optional[torch.Tensor]:
+    """
+    Returns the (cached) L2-normalized embedding of a job description.
+    """
+    if get_model() is None:
+        return None
+    jd_hash = hashlib.sha256(jd_text.encode()).hexdigest()
+    return _encode_jd(jd_hash, jd_text)
+
+def calculate_semantic_similarity(
+    model: SentenceTransformer,
+    text1: str,
+    text2: str,
+    jd_embedding: Optional[torch.Tensor] = None
+) -> float:
     """
     Calculates the cosine similarity score between two texts.
+    If a pre-computed embedding for text2 (the JD) is given, only text1 is encoded.
     """
     if model is None:
         print("Model is not loaded. Returning 0.0")
         return 0.0
         
     try:
-        # Encode texts to get their embeddings (numerical representations)
-        embedding1 = model.encode(text1, convert_to_tensor=True)
-        embedding2 = model.encode(text2, convert_to_tensor=True)
-        
-        # Compute cosine similarity
-        similarity = util.cos_sim(embedding1, embedding2)
+        # Encode texts to get their embeddings (numerical representations).
+        # Embeddings are L2-normalized, so cosine similarity is a plain dot product.
+        if jd_embedding is None:
+            # Encode both texts in a single forward pass instead of two
+            embeddings = encode(model, [text1, text2], batch_size=2)
+            embedding1, jd_embedding = embeddings[0], embeddings[1]
+        else:
+            embedding1 = encode(model, text1)
         
         # The result is a tensor, get the float value
-        return similarity.item()
+        return torch.dot(embedding1, jd_embedding).item()
     except Exception as e:
         print(f"Error calculating similarity: {e}")
         return 0.0
 
-def check_skill_coverage(resume_skills: List[str], jd_skills: List[str]) -> Dict[str, Any]:
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent encode requests into a single encoder forward pass.
+    Texts queued within `max_wait` seconds (up to `max_batch_size` of them)
+    are encoded together, which keeps the model busy under concurrent load.
+    """
+
+    def __init__(self, max_batch_size: int = 32, max_wait: float = 0.01):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def embed(self, text: str) -> torch.Tensor:
+        """Queues a text and waits for its L2-normalized embedding."""
+        if self._worker is None or self._worker.done():
+            # Started lazily so it runs on the server's event loop
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((future, text))
+        return await future
+
+    async def _collect_batch(self) -> List[Any]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            futures = [future for future, _ in batch]
+            texts = [text for _, text in batch]
+
+            try:
+                # Run the forward pass in a worker thread so the event loop keeps accepting requests
+                # Read MODEL directly: requests only get here once the model is loaded,
+                # and get_model() could block the event loop on a load
+                embeddings = await asyncio.to_thread(encode, MODEL, texts, batch_size=len(texts))
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, embedding in zip(futures, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+BATCHER = EmbeddingBatcher()
+
+# Resume embeddings keyed by the SHA-256 of the uploaded file (same key as parser.RESUME_CACHE),
+# so a resume matched against a new JD skips the encoder entirely.
+RESUME_EMBEDDING_CACHE = LRUCache(maxsize=1024)
+
+async def calculate_semantic_similarity_async(
+    resume_text: str,
+    jd_embedding: Optional[torch.Tensor],
+    resume_hash: Optional[str] = None
+) -> float:
+    """
+    Async counterpart of calculate_semantic_similarity used by the API.
+    The resume embedding comes from the shared batcher, so concurrent requests
+    share one encoder forward pass.
+    """
+    # Reads MODEL rather than calling get_model(), which could block the event loop on a load
+    if MODEL is None or jd_embedding is None:
+        print("Model is not loaded. Returning 0.0")
+        return 0.0
+
+    try:
+        embedding = RESUME_EMBEDDING_CACHE.get(resume_hash) if resume_hash is not None else None
+        if embedding is None:
+            embedding = await BATCHER.embed(resume_text)
+            if resume_hash is not None:
+                # Clone the row so the cache doesn't keep the whole batch tensor alive
+                RESUME_EMBEDDING_CACHE[resume_hash] = embedding.clone()
+        return torch.dot(embedding, jd_embedding).item()
+    except Exception as e:
+        print(f"Error calculating similarity: {e}")
+        return 0.0
+
+def check_skill_coverage(resume_mask: int, jd_mask: int) -> Dict[str, Any]:
     """
     Checks which required skills (from JD) are present in the resume.
+    Both skill sets are bitmasks (see parser.skills_to_mask), so the set
+    operations are single integer ops; names are only decoded for the response.
     """
-    if not jd_skills:
+    if not jd_mask:
         return {
             "matched_skills": [],
             "missing_skills": [],
             "coverage_percentage": 1.0  # If no skills are required, coverage is 100%
         }
         
-    set_resume_skills = set(resume_skills)
-    set_jd_skills = set(jd_skills)
-    
-    matched_skills = sorted(list(set_resume_skills.intersection(set_jd_skills)))
-    missing_skills = sorted(list(set_jd_skills.difference(set_resume_skills)))
+    matched_mask = resume_mask & jd_mask
+    missing_mask = jd_mask & ~resume_mask
     
-    coverage_percentage = len(matched_skills) / len(set_jd_skills)
+    coverage_percentage = matched_mask.bit_count() / jd_mask.bit_count()
     
     return {
-        "matched_skills": matched_skills,
-        "missing_skills": missing_skills,
+        "matched_skills": mask_to_skills(matched_mask),
+        "missing_skills": mask_to_skills(missing_mask),
         "coverage_percentage": coverage_percentage
     }
 
+def batch_skill_coverage(resume_matrix: np.ndarray, jd_packed: np.ndarray) -> np.ndarray:
+    """
+    Skill coverage of many resumes at once.
+    `resume_matrix` stacks one packed skill row per resume (see parser.pack_skills),
+    `jd_packed` is the JD's packed row. Returns one coverage value per resume.
+    """
+    required = int(np.unpackbits(jd_packed).sum())
+    if required == 0:
+        return np.ones(len(resume_matrix))  # If no skills are required, coverage is 100%
+
+    matched = np.unpackbits(resume_matrix & jd_packed[None, :], axis=1).sum(axis=1)
+    return matched / required
+
+DEFAULT_WEIGHTS = {
+    "semantic": 0.6,  # 60% weight on semantic text match
+    "skill": 0.4      # 40% weight on must-have skill coverage
+}
+_DEFAULT_SEMANTIC_WEIGHT = DEFAULT_WEIGHTS["semantic"]
+_DEFAULT_SKILL_WEIGHT = DEFAULT_WEIGHTS["skill"]
+
+# The explanation for the default weights, with only the two scores left to fill in
+_DEFAULT_EXPLANATION_FMT = (
+    f"Score based on {_DEFAULT_SEMANTIC_WEIGHT*100:.0f}% semantic similarity "
+    "({:.2f}) and "
+    f"{_DEFAULT_SKILL_WEIGHT*100:.0f}% skill coverage "
+    "({:.2f})."
+)
+
 def calculate_final_score(
     semantic_score: float, 
     skill_coverage: float,
@@ -67,9 +360,10 @@ def calculate_final_score(
     Calculates a final weighted score and provides an explanation.
     """
     if weights is None:
-        weights = {
-            "semantic": 0.6,  # 60% weight on semantic text match
-            "skill": 0.4      # 40% weight on must-have skill coverage
+        # Fast path for the default weights (almost every call)
+        return {
+            "final_score": _DEFAULT_SEMANTIC_WEIGHT * semantic_score + _DEFAULT_SKILL_WEIGHT * skill_coverage,
+            "explanation": _DEFAULT_EXPLANATION_FMT.format(semantic_score, skill_coverage)
         }
         
     weighted_score = (weights["semantic"] * semantic_score) + (weights["skill"] * skill_coverage)
@@ -88,7 +382,7 @@ def calculate_final_score(
 
 # --- Test Block ---
 if __name__ == "__main__":
-    if MODEL is None:
+    if get_model() is None:
         print("Cannot run test: Model failed to load.")
     else:
         print("\n--- Matcher Test ---")
@@ -101,11 +395,17 @@ if __name__ == "__main__":
         jd_skills = ["java", "aws", "sql"]
 
         # 1. Test Semantic Similarity
-        similarity = calculate_semantic_similarity(MODEL, resume_text, jd_text)
+        similarity = calculate_semantic_similarity(get_model(), resume_text, jd_text)
         print(f"Semantic Similarity: {similarity:.4f}")
+
+        # 1b. The dot product of normalized embeddings should equal cosine similarity of the raw ones
+        from sentence_transformers import util
+        raw_embeddings = get_model().encode([resume_text, jd_text], convert_to_tensor=True)
+        reference = util.cos_sim(raw_embeddings[0], raw_embeddings[1]).item()
+        print(f"Cosine Similarity (reference): {reference:.4f} (difference: {abs(similarity - reference):.2e})")
         
         # 2. Test Skill Coverage
-        coverage = check_skill_coverage(resume_skills, jd_skills)
+        coverage = check_skill_coverage(skills_to_mask(resume_skills), skills_to_mask(jd_skills))
         print(f"Skill Coverage: {coverage}")
         
         # 3. Test Final Score
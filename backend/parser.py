@@ -1,8 +1,15 @@
+import functools
+import os
 import re
+import threading
+import ahocorasick
+import pypdfium2 as pdfium
+from cachetools import LRUCache
 from pdfminer.high_level import extract_text
 import docx2txt
+import numpy as np
 from rapidfuzz import process, fuzz
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Optional, Set, Union
 
 # A more comprehensive list of skills. In a real project, this would be in a database.
 SKILL_DATABASE = [
@@ -16,93 +23,247 @@ SKILL_DATABASE = [
     'project management', 'product management', 'ui/ux design', 'team leadership'
 ]
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extracts text content from a PDF file."""
+# Position of each skill in SKILL_DATABASE (its column in packed skill rows)
+SKILL_POSITION = {name: i for i, name in enumerate(SKILL_DATABASE)}
+
+# Every skill gets one bit, so a set of skills is a single int and set
+# operations become bitwise ops (see matcher.check_skill_coverage).
+SKILL_INDEX = {name: 1 << i for name, i in SKILL_POSITION.items()}
+
+# Parsed resumes keyed by the SHA-256 of the uploaded file's bytes.
+# Resumes are often re-submitted against different JDs; a hit skips extraction entirely.
+RESUME_CACHE = LRUCache(maxsize=1024)
+_resume_cache_lock = threading.Lock()
+
+def skills_to_mask(skills: List[str]) -> int:
+    """Encodes a list of skills from SKILL_DATABASE as a bitmask."""
+    mask = 0
+    for skill in skills:
+        mask |= SKILL_INDEX[skill]
+    return mask
+
+def mask_to_skills(mask: int) -> List[str]:
+    """Decodes a skill bitmask back to a list of skill names, in SKILL_DATABASE order."""
+    return [name for name, bit in SKILL_INDEX.items() if mask & bit]
+
+def pack_skills(skills: List[str]) -> np.ndarray:
+    """
+    Encodes a list of skills as a packed bit row (np.packbits) in SKILL_DATABASE order.
+    Rows for many resumes stack into a uint8 matrix for vectorized coverage
+    (see matcher.batch_skill_coverage).
+    """
+    row = np.zeros(len(SKILL_DATABASE), dtype=bool)
+    for skill in skills:
+        row[SKILL_POSITION[skill]] = True
+    return np.packbits(row)
+
+# PDFium is not thread-safe: no two PDFium calls may run at the same time, even on
+# different documents. Resumes are parsed in worker threads, so all PDFium use is serialized.
+_pdfium_lock = threading.Lock()
+
+def extract_text_from_pdf(source: Union[str, BinaryIO]) -> str:
+    """
+    Extracts text content from a PDF file path or binary stream.
+    Uses PDFium (C++) for speed and falls back to pdfminer for PDFs it can't read.
+    """
     try:
-        text = extract_text(file_path)
-        return text.lower()
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(source)
+            try:
+                text = "\n".join(page.get_textpage().get_text_range() for page in pdf)
+            finally:
+                pdf.close()
+        return text
     except Exception as e:
-        print(f"Error reading PDF {file_path}: {e}")
+        print(f"PDFium could not read PDF {getattr(source, 'name', source)}, falling back to pdfminer: {e}")
+
+    try:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        text = extract_text(source)
+        return text
+    except Exception as e:
+        print(f"Error reading PDF {getattr(source, 'name', source)}: {e}")
         return ""
 
-def extract_text_from_docx(file_path: str) -> str:
-    """Extracts text content from a DOCX file."""
+def extract_text_from_docx(source: Union[str, BinaryIO]) -> str:
+    """Extracts text content from a DOCX file path or binary stream."""
     try:
-        text = docx2txt.process(file_path)
-        return text.lower()
+        text = docx2txt.process(source)
+        return text
     except Exception as e:
-        print(f"Error reading DOCX {file_path}: {e}")
+        print(f"Error reading DOCX {getattr(source, 'name', source)}: {e}")
         return ""
 
+def _build_automaton(skill_list: List[str]) -> ahocorasick.Automaton:
+    """Builds an Aho-Corasick automaton that finds every skill in one pass over the text."""
+    automaton = ahocorasick.Automaton()
+    for skill in skill_list:
+        automaton.add_word(skill, skill)
+    automaton.make_automaton()
+    return automaton
+
+# Built once at import, since SKILL_DATABASE is fixed
+SKILL_AUTOMATON = _build_automaton(SKILL_DATABASE)
+
+# Tokenizer for the fuzzy/semantic pass (keeps "c++", "c#", "node.js" in one piece)
+TOKEN_PATTERN = re.compile(r'[a-z0-9+#.]{2,}')
+
+# Skills shorter than this are only matched exactly: one extra letter already scores
+# above the fuzzy cutoff for them ("grit" -> git, "laws" -> aws, "reds" -> redis, "reacts" -> react)
+FUZZY_MIN_SKILL_LENGTH = 6
+
+# How skills without an exact mention are matched:
+# "fuzzy" compares tokens to skill names with RapidFuzz,
+# "semantic" compares token/bigram embeddings to precomputed skill embeddings
+# (catches synonyms, but costs an encoder pass over the candidates).
+SKILL_MATCHER = os.getenv("PARSER_SKILL_MATCHER", "fuzzy")
+SEMANTIC_SKILL_THRESHOLD = 0.75
+
+# Finds patterns like "5 years", "5+ years", "5.5 years", "X yrs"
+EXPERIENCE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*\+?\s*ye?a?rs?', re.IGNORECASE)
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    """Checks that text[start:end + 1] is not part of a longer word (e.g. "java" in "javascript")."""
+    before = text[start - 1] if start > 0 else " "
+    after = text[end + 1] if end + 1 < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
+
+@functools.lru_cache(maxsize=1)
+def _skill_database_embeddings():
+    """Encodes SKILL_DATABASE once; a (skills x dim) matrix of normalized embeddings, rows in database order."""
+    import matcher  # Imported lazily to avoid the circular matcher <-> parser import
+    return matcher.encode(matcher.get_model(), SKILL_DATABASE)
+
+def _skill_embeddings(skills: List[str]):
+    """Embeddings for the given skills, taken from the precomputed SKILL_DATABASE rows when possible."""
+    if all(skill in SKILL_POSITION for skill in skills):
+        return _skill_database_embeddings()[[SKILL_POSITION[skill] for skill in skills]]
+
+    import matcher
+    return matcher.encode(matcher.get_model(), skills)
+
+def _match_skills_semantic(candidates: List[str], skill_list: List[str]) -> Set[str]:
+    """
+    Matches candidate phrases to skills by embedding similarity.
+    One batched encode plus one matrix product replaces the per-token fuzzy scan.
+    """
+    import matcher
+
+    model = matcher.get_model()
+    if model is None or not candidates:
+        return set()
+
+    skill_embeddings = _skill_embeddings(skill_list)
+    candidate_embeddings = matcher.encode(model, candidates)
+    best_scores = (candidate_embeddings @ skill_embeddings.T).max(dim=0).values
+
+    return {
+        skill for skill, score in zip(skill_list, best_scores.tolist())
+        if score > SEMANTIC_SKILL_THRESHOLD
+    }
+
 def extract_skills(text: str, skill_list: List[str], threshold: int = 85) -> List[str]:
     """
-    Extracts skills from text using fuzzy matching.
-    We check for matches with a score > threshold to account for typos or variations.
+    Extracts skills from text.
+    Exact mentions are found with a single Aho-Corasick scan. Remaining skills are
+    fuzzy matched (score > threshold) against the unique tokens and bigrams of the text to
+    account for typos or variations, or matched by embedding similarity when
+    SKILL_MATCHER is "semantic".
     """
+    # Skill names are lowercase; this is the only place the text gets lowercased
+    text = text.lower()
     found_skills = set()
-    # Using rapidfuzz.process.extract to find all matches above the threshold
-    # This is more efficient than looping and checking one by one
-    matches = process.extract(text, skill_list, scorer=fuzz.partial_ratio, limit=None, score_cutoff=threshold)
-    
-    for skill, score, _ in matches:
-        found_skills.add(skill)
+    automaton = SKILL_AUTOMATON if skill_list is SKILL_DATABASE else _build_automaton(skill_list)
+
+    for end, skill in automaton.iter(text):
+        if _is_whole_word(text, end - len(skill) + 1, end):
+            found_skills.add(skill)
+
+    remaining = [skill for skill in skill_list if skill not in found_skills]
+    if remaining:
+        tokens = TOKEN_PATTERN.findall(text)
+        # Bigrams let multi-word skills like "machine learning" match
+        candidates = sorted(set(tokens) | {f"{first} {second}" for first, second in zip(tokens, tokens[1:])})
+        if SKILL_MATCHER == "semantic":
+            found_skills |= _match_skills_semantic(candidates, remaining)
+        else:
+            # Short skills only count as exact mentions (found above)
+            fuzzy_skills = [skill for skill in remaining if len(skill) >= FUZZY_MIN_SKILL_LENGTH]
+            if candidates and fuzzy_skills:
+                # Fuzzy pass: one (candidates x skills) score matrix computed in C across all cores,
+                # instead of sliding every skill over the full text. Scores below threshold are 0.
+                scores = process.cdist(candidates, fuzzy_skills, scorer=fuzz.ratio, score_cutoff=threshold, workers=-1)
+                found_skills.update(fuzzy_skills[j] for j in np.unique(np.nonzero(scores)[1]))
         
-    return sorted(list(found_skills))
+    # Returned in skill_list order, so no sort is needed
+    return [skill for skill in skill_list if skill in found_skills]
 
 def extract_years_of_experience(text: str) -> float:
     """
     Extracts the maximum years of experience mentioned using regex.
     """
-    # Regex to find patterns like "5 years", "5+ years", "5.5 years", "X yrs"
-    patterns = [
-        r'(\d+\.?\d*)\s*\+?\s*ye?a?rs?',
-        r'(\d+\.?\d*)\s*\+?\s*yrs?'
-    ]
-    
-    found_years = [0.0] # Start with 0
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        for match in matches:
-            try:
-                found_years.append(float(match))
-            except ValueError:
-                continue
-                
-    # Return the maximum experience found
-    return max(found_years)
-
-def parse_resume(file_path: str) -> Dict[str, Any]:
+    # Keeps a running max over the matches instead of collecting them in lists
+    return max((float(match.group(1)) for match in EXPERIENCE_PATTERN.finditer(text)), default=0.0)
+
+def parse_resume(
+    source: Union[str, BinaryIO],
+    filename: Optional[str] = None,
+    file_hash: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Main function to parse a resume file.
+    Accepts a file path, or a binary stream plus its original filename.
     Detects file type, extracts text, skills, and experience.
+    If `file_hash` (SHA-256 of the file bytes) is given, results are cached under it.
     """
-    text = ""
-    if file_path.endswith(".pdf"):
-        text = extract_text_from_pdf(file_path)
-    elif file_path.endswith(".docx"):
-        text = extract_text_from_docx(file_path)
+    if filename is None:
+        if not isinstance(source, str):
+            # A stream has no name to detect the file type from
+            return {"error": "Unsupported file type"}
+        filename = source
+    filename = filename.lower()
+
+    if filename.endswith(".pdf"):
+        extract = extract_text_from_pdf
+    elif filename.endswith(".docx"):
+        extract = extract_text_from_docx
     else:
         return {"error": "Unsupported file type"}
 
+    # Looked up only after the file type check, so a cached parse never bypasses it
+    if file_hash is not None:
+        with _resume_cache_lock:
+            cached = RESUME_CACHE.get(file_hash)
+        if cached is not None:
+            return dict(cached)
+
+    text = extract(source)
+
     if not text:
         return {"error": "Could not read text from file"}
 
     skills = extract_skills(text, SKILL_DATABASE)
     experience = extract_years_of_experience(text)
     
-    return {
+    resume_data = {
         "raw_text": text,
         "skills": skills,
+        "skill_mask": skills_to_mask(skills),
         "experience_years": experience
     }
 
+    if file_hash is not None:
+        with _resume_cache_lock:
+            RESUME_CACHE[file_hash] = resume_data
+    return dict(resume_data)
+
 def parse_skills_from_jd(jd_text: str) -> List[str]:
     """
     Extracts required skills from a job description.
     Uses the same skill extraction logic as the resume parser.
     """
-    jd_text_lower = jd_text.lower()
-    skills = extract_skills(jd_text_lower, SKILL_DATABASE, threshold=90) # Higher threshold for JD
+    skills = extract_skills(jd_text, SKILL_DATABASE, threshold=90) # Higher threshold for JD
     return skills
 
 # --- Test Block ---